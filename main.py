@@ -1,27 +1,71 @@
+import asyncio
 import redis
+import redis.asyncio
 import csv
 import logging
+import socket
+import msgpack
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import chain, islice
 from typing import List, Dict, Tuple, Optional
 
+# Configure logging once at import instead of in every client constructor.
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+class _FireAndForgetPipe:
+    """
+    Pipeline-shaped adapter over a dedicated connection whose replies are
+    suppressed with CLIENT REPLY OFF. Commands are written straight to the
+    socket and never answered, so execute() has nothing to read. Every
+    send disables redis-py's periodic health check: its PING would block
+    forever waiting for a PONG the server won't send while replies are off.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+
+    def hset(self, name, mapping):
+        self.connection.send_command('HSET', name, *chain.from_iterable(mapping.items()),
+                                     check_health=False)
+
+    def set(self, name, value):
+        self.connection.send_command('SET', name, value, check_health=False)
+
+    def sadd(self, name, *values):
+        self.connection.send_command('SADD', name, *values, check_health=False)
+
+    def zadd(self, name, mapping):
+        self.connection.send_command(
+            'ZADD', name,
+            *chain.from_iterable((score, member) for member, score in mapping.items()),
+            check_health=False)
+
+    def execute(self):
+        return []
+
 class RedisClient:
-    def __init__(self, host: str, port: int, username: str, password: str):
+    def __init__(self, host: str, port: int, username: str, password: str,
+                 pack_user_records: bool = False):
         """
         Initialize the Redis client with connection parameters.
-        
+
         :param host: Redis server host
         :param port: Redis server port
         :param username: Redis username
         :param password: Redis password
+        :param pack_user_records: Store each user as a single MessagePack
+            blob instead of a hash. Blobs cut memory and wire bytes for
+            whole-record reads, but field-level queries (last names,
+            emails, region filtering) require the default hash layout.
         """
         self.redis = None
         self.host = host
         self.port = port
         self.username = username
         self.password = password
-        
-        # Configure logging
-        logging.basicConfig(level=logging.INFO, 
-                            format='%(asctime)s - %(levelname)s - %(message)s')
+        self.pack_user_records = pack_user_records
+        self._top_players_script = None
         self.logger = logging.getLogger(__name__)
 
     def connect(self) -> bool:
@@ -31,79 +75,226 @@ class RedisClient:
         :return: True if connection successful, False otherwise
         """
         try:
-            self.redis = redis.StrictRedis(
+            # Keepalive probes detect dead peers early; the values are
+            # idle-seconds before probing, interval between probes, and
+            # probe count (Linux-only constants, hence the guard).
+            keepalive_options = {}
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                keepalive_options = {
+                    socket.TCP_KEEPIDLE: 60,
+                    socket.TCP_KEEPINTVL: 10,
+                    socket.TCP_KEEPCNT: 3,
+                }
+            # An explicit pool reuses established connections across
+            # commands and pipelines instead of paying TCP setup again.
+            pool = redis.ConnectionPool(
                 host=self.host,
                 port=self.port,
                 username=self.username,
                 password=self.password,
-                decode_responses=True
+                max_connections=32,
+                socket_keepalive=True,
+                socket_keepalive_options=keepalive_options,
+                health_check_interval=30,
+                # MessagePack blobs are binary, so replies must stay raw
+                # bytes when packed records are enabled.
+                decode_responses=not self.pack_user_records
             )
+            # redis-py auto-selects the C-accelerated hiredis RESP parser
+            # when the hiredis package (see requirements.txt) is installed,
+            # which speeds up decoding of bulk replies considerably.
+            self.redis = redis.StrictRedis(connection_pool=pool)
             # Perform a simple ping to verify connection
             self.redis.ping()
             self.logger.info("Successfully connected to Redis.")
             return True
         except Exception as e:
-            self.logger.error(f"Failed to connect to Redis: {e}")
+            self.logger.error("Failed to connect to Redis: %s", e)
             return False
 
-    def load_users(self, file_path: str) -> bool:
+    def load_users(self, file_path: str, batch_size: int = 1000,
+                   fire_and_forget: bool = False) -> bool:
         """
         Load user data from a file into Redis.
-        
+
         :param file_path: Path to the users file
+        :param batch_size: Number of HSET commands to pipeline per round-trip
+        :param fire_and_forget: Suppress server replies during the load;
+            faster still, but command errors only surface at the end
         :return: True if loading successful, False otherwise
         """
         try:
-            with open(file_path, 'r') as file:
-                for line in file:
-                    # Split the line, handling potential variations in delimiter
-                    fields = [f.strip('"') for f in line.strip().split('" "')]
-                    
-                    # Ensure we have enough fields
-                    if len(fields) < 3:
-                        self.logger.warning(f"Skipping invalid line: {line}")
-                        continue
-                    
-                    user_id = fields[0]
-                    # Create a dictionary of user attributes
-                    user_data = {fields[i]: fields[i+1] for i in range(1, len(fields)-1, 2)}
-                    
-                    # Store user data in Redis hash
-                    self.redis.hset(user_id, mapping=user_data)
-            
+            # A 1 MiB read buffer keeps the reader fed with few syscalls;
+            # newline='' hands raw lines to the csv module as it expects.
+            with open(file_path, 'r', buffering=1 << 20, newline='') as file:
+                if fire_and_forget:
+                    with self._suppressed_replies() as conn:
+                        pipe = _FireAndForgetPipe(conn)
+                        self._ingest_users(file, lambda: pipe, batch_size)
+                else:
+                    self._ingest_users(
+                        file, lambda: self.redis.pipeline(transaction=False),
+                        batch_size)
+
             self.logger.info("Successfully loaded users into Redis.")
             return True
         except Exception as e:
-            self.logger.error(f"Error loading users: {e}")
+            self.logger.error("Error loading users: %s", e)
             return False
 
-    def load_scores(self, file_path: str) -> bool:
+    def _ingest_users(self, file, make_pipe, batch_size: int) -> None:
+        """
+        Parse user records from an open file and write them via pipelines.
+
+        :param file: Open text file of quoted, space-delimited user records
+        :param make_pipe: Factory returning a fresh pipeline to write to
+        :param batch_size: Number of HSET commands to pipeline per round-trip
+        """
+        # Pipeline the HSETs so each user doesn't cost a full network
+        # round-trip; transaction=False skips MULTI/EXEC.
+        pipe = make_pipe()
+        pending = 0
+        # Let the C-implemented csv module tokenize the quoted,
+        # space-delimited fields in one pass over each line.
+        reader = csv.reader(file, delimiter=' ', quotechar='"',
+                            skipinitialspace=True)
+        for fields in reader:
+            # Ensure we have enough fields
+            if len(fields) < 3:
+                self.logger.warning("Skipping invalid line: %s", fields)
+                continue
+
+            user_id = fields[0]
+            # Create a dictionary of user attributes
+            user_data = {fields[i]: fields[i+1] for i in range(1, len(fields)-1, 2)}
+
+            # Store user data as a packed blob or a Redis hash
+            if self.pack_user_records:
+                pipe.set(user_id, msgpack.packb(user_data, use_bin_type=True))
+            else:
+                pipe.hset(user_id, mapping=user_data)
+
+            # Maintain secondary indexes so region queries can look
+            # up matches directly instead of scanning the keyspace:
+            # a set per (country, gender) and a latitude sorted set.
+            country = user_data.get('country')
+            gender = user_data.get('gender')
+            if country and gender:
+                pipe.sadd(f"idx:country:{country}:gender:{gender}", user_id)
+            latitude = user_data.get('latitude')
+            if latitude:
+                try:
+                    pipe.zadd("idx:latitude", {user_id: float(latitude)})
+                except ValueError:
+                    self.logger.warning("Skipping latitude index for %s: "
+                                        "invalid latitude %r", user_id, latitude)
+            pending += 1
+            if pending >= batch_size:
+                pipe.execute()
+                pipe = make_pipe()
+                pending = 0
+
+        if pending:
+            pipe.execute()
+
+    @contextmanager
+    def _suppressed_replies(self):
+        """
+        Yield a dedicated connection with server replies turned off.
+
+        Commands written on the connection are fire-and-forget: the server
+        sends nothing back (not even errors) until CLIENT REPLY ON is
+        restored, and the closing PING resynchronizes the stream and
+        confirms the server is still healthy.
+        """
+        conn = self.redis.connection_pool.get_connection('CLIENT')
+        try:
+            # check_health=False throughout: the periodic health-check PING
+            # would block forever once replies are suppressed, since the
+            # server won't answer it until CLIENT REPLY ON is restored.
+            conn.send_command('CLIENT', 'REPLY', 'OFF', check_health=False)
+            yield conn
+        finally:
+            try:
+                conn.send_command('CLIENT', 'REPLY', 'ON', check_health=False)
+                conn.read_response()  # +OK from CLIENT REPLY ON
+                conn.send_command('PING')
+                conn.read_response()  # sentinel: confirms the stream is in sync
+            except Exception:
+                # Don't return a desynchronized connection to the pool.
+                conn.disconnect()
+                raise
+            finally:
+                self.redis.connection_pool.release(conn)
+
+    def load_scores(self, file_path: str, batch_size: int = 5000,
+                    fire_and_forget: bool = False) -> bool:
         """
         Load user scores from a CSV file into Redis sorted sets.
-        
+
         :param file_path: Path to the user scores CSV file
+        :param batch_size: Number of rows to buffer before flushing to Redis
+        :param fire_and_forget: Suppress server replies during the load;
+            faster still, but command errors only surface at the end
         :return: True if loading successful, False otherwise
         """
         try:
-            with open(file_path, 'r') as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header row
-                
-                for row in reader:
-                    # Validate row has required fields
-                    if len(row) < 3:
-                        self.logger.warning(f"Skipping invalid row: {row}")
-                        continue
-                    
-                    leaderboard, user_id, score = row[0], row[1], int(row[2])
-                    self.redis.zadd(leaderboard, {user_id: score})
-            
+            # A 1 MiB read buffer keeps the reader fed with few syscalls.
+            with open(file_path, 'r', buffering=1 << 20) as file:
+                if fire_and_forget:
+                    with self._suppressed_replies() as conn:
+                        self._ingest_scores(file, _FireAndForgetPipe(conn), batch_size)
+                else:
+                    self._ingest_scores(file, None, batch_size)
+
             self.logger.info("Successfully loaded scores into Redis.")
             return True
         except Exception as e:
-            self.logger.error(f"Error loading scores: {e}")
+            self.logger.error("Error loading scores: %s", e)
             return False
 
+    def _ingest_scores(self, file, pipe, batch_size: int) -> None:
+        """
+        Parse score rows from an open CSV file and write them via pipelines.
+
+        :param file: Open CSV file of (leaderboard, user_id, score) rows
+        :param pipe: Pipeline to flush through, or None for a fresh
+            pipeline per flush
+        :param batch_size: Number of rows to buffer before flushing to Redis
+        """
+        reader = csv.reader(file)
+        next(reader)  # Skip header row
+
+        # Pull whole chunks of rows at a time, then buffer them per
+        # leaderboard so each flush issues a single variadic ZADD per
+        # leaderboard on a pipelined connection.
+        scores = defaultdict(dict)
+        while True:
+            chunk = list(islice(reader, batch_size))
+            if not chunk:
+                break
+            for row in chunk:
+                # Validate row has required fields
+                if len(row) < 3:
+                    self.logger.warning("Skipping invalid row: %s", row)
+                    continue
+                scores[row[0]][row[1]] = int(row[2])
+            self._flush_scores(scores, pipe)
+
+    def _flush_scores(self, scores: Dict[str, Dict[str, int]], pipe=None) -> None:
+        """
+        Write buffered leaderboard scores to Redis and clear the buffer.
+
+        :param scores: Mapping of leaderboard -> {user_id: score}
+        :param pipe: Pipeline to write through; defaults to a fresh one
+        """
+        if pipe is None:
+            pipe = self.redis.pipeline(transaction=False)
+        for leaderboard, members in scores.items():
+            pipe.zadd(leaderboard, members)
+        pipe.execute()
+        scores.clear()
+
     def get_user_data(self, user_id: str) -> Optional[Dict[str, str]]:
         """
         Retrieve all attributes for a specific user.
@@ -112,25 +303,33 @@ class RedisClient:
         :return: Dictionary of user attributes or None
         """
         try:
+            if self.pack_user_records:
+                packed = self.redis.get(user_id)
+                return msgpack.unpackb(packed, raw=False) if packed else None
             user_data = self.redis.hgetall(user_id)
             return user_data if user_data else None
         except Exception as e:
-            self.logger.error(f"Error retrieving user data: {e}")
+            self.logger.error("Error retrieving user data: %s", e)
             return None
 
     def get_user_coordinates(self, user_id: str) -> Optional[Tuple[str, str]]:
         """
         Get the coordinates (longitude and latitude) for a user.
-        
+
         :param user_id: User identifier
         :return: Tuple of (longitude, latitude) or None
         """
         try:
-            longitude = self.redis.hget(user_id, 'longitude')
-            latitude = self.redis.hget(user_id, 'latitude')
+            if self.pack_user_records:
+                user_data = self.get_user_data(user_id) or {}
+                longitude = user_data.get('longitude')
+                latitude = user_data.get('latitude')
+            else:
+                # HMGET fetches both fields in a single round-trip.
+                longitude, latitude = self.redis.hmget(user_id, 'longitude', 'latitude')
             return (longitude, latitude) if longitude and latitude else None
         except Exception as e:
-            self.logger.error(f"Error retrieving user coordinates: {e}")
+            self.logger.error("Error retrieving user coordinates: %s", e)
             return None
 
     def get_users_by_even_id(self) -> Tuple[List[str], List[str]]:
@@ -141,15 +340,46 @@ class RedisClient:
         """
         try:
             keys, last_names = [], []
-            for key in self.redis.scan_iter("user:*"):
-                if int(key.split(':')[1]) % 2 == 0:
-                    keys.append(key)
-                    last_names.append(self.redis.hget(key, 'last_name'))
+            batch = []
+            # A numeric id is even exactly when it ends in an even digit,
+            # so one SCAN per even-digit pattern pushes the filter to the
+            # server and odd-id keys never cross the wire. The large COUNT
+            # keeps cursor round-trips low; matching keys are buffered and
+            # their HGETs flushed in pipelined batches.
+            for suffix in ('0', '2', '4', '6', '8'):
+                cursor = 0
+                while True:
+                    cursor, page = self.redis.scan(
+                        cursor=cursor, match=f"user:*{suffix}", count=1000)
+                    for key in page:
+                        batch.append(key)
+                        if len(batch) >= 500:
+                            self._fetch_last_names(batch, keys, last_names)
+                    if cursor == 0:
+                        break
+
+            if batch:
+                self._fetch_last_names(batch, keys, last_names)
             return keys, last_names
         except Exception as e:
-            self.logger.error(f"Error retrieving users by even ID: {e}")
+            self.logger.error("Error retrieving users by even ID: %s", e)
             return [], []
 
+    def _fetch_last_names(self, batch: List[str], keys: List[str], last_names: List[str]) -> None:
+        """
+        Fetch last names for a batch of keys in one pipelined round-trip.
+
+        :param batch: Buffered user keys; cleared after the fetch
+        :param keys: Output list of user keys to extend
+        :param last_names: Output list of last names to extend
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for key in batch:
+            pipe.hget(key, 'last_name')
+        keys.extend(batch)
+        last_names.extend(pipe.execute())
+        batch.clear()
+
     def get_female_users_in_region(self, countries: List[str], min_lat: float, max_lat: float) -> List[Dict[str, str]]:
         """
         Find female users in specified countries within a latitude range.
@@ -160,19 +390,77 @@ class RedisClient:
         :return: List of matching user records
         """
         try:
+            countries = frozenset(countries)
+            if not countries:
+                return []
+
+            # Resolve the (country, gender) and latitude predicates through
+            # the secondary indexes maintained by load_users, so the query
+            # touches O(matches) keys instead of scanning the keyspace.
+            candidates = self.redis.sunion(
+                [f"idx:country:{country}:gender:female" for country in countries])
+            in_band = self.redis.zrangebyscore("idx:latitude", min_lat, max_lat)
+
             matching_users = []
-            for key in self.redis.scan_iter("user:*"):
-                user_data = self.redis.hgetall(key)
-                # Validate all required fields exist
-                if (user_data.get('gender') == 'female' and 
-                    user_data.get('country') in countries and 
-                    min_lat <= float(user_data.get('latitude', 0)) <= max_lat):
-                    matching_users.append(user_data)
+            batch = []
+            for user_id in in_band:
+                if user_id in candidates:
+                    batch.append(user_id)
+                    if len(batch) >= 500:
+                        matching_users.extend(
+                            self._filter_region_batch(batch, countries, min_lat, max_lat))
+
+            if batch:
+                matching_users.extend(
+                    self._filter_region_batch(batch, countries, min_lat, max_lat))
             return matching_users
         except Exception as e:
-            self.logger.error(f"Error retrieving female users in region: {e}")
+            self.logger.error("Error retrieving female users in region: %s", e)
             return []
 
+    # Server-side top-N lookup: one EVALSHA round-trip returns the emails
+    # directly, so the intermediate user ids never reach the client.
+    TOP_PLAYERS_LUA = """
+    local ids = redis.call('ZREVRANGE', KEYS[1], 0, ARGV[1])
+    local emails = {}
+    for i, id in ipairs(ids) do
+        emails[i] = redis.call('HGET', id, 'email')
+    end
+    return emails
+    """
+
+    # Fields projected by the region query; HMGET on these keeps full
+    # hashes from crossing the wire for users that won't match.
+    REGION_FIELDS = ('gender', 'country', 'latitude', 'longitude',
+                     'first_name', 'last_name', 'email')
+
+    def _filter_region_batch(self, batch: List[str], countries: frozenset,
+                             min_lat: float, max_lat: float) -> List[Dict[str, str]]:
+        """
+        Fetch a batch of users with pipelined HMGETs and keep the matches.
+
+        :param batch: Buffered user keys; cleared after the fetch
+        :param countries: Frozenset of countries to match against
+        :param min_lat: Minimum latitude
+        :param max_lat: Maximum latitude
+        :return: List of matching user records (projected fields only)
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for key in batch:
+            pipe.hmget(key, *self.REGION_FIELDS)
+        matches = []
+        for values in pipe.execute():
+            # Check the cheapest predicates first (equality, then set
+            # membership, then the float parse) and only build the result
+            # dict for users that actually match.
+            gender, country, latitude = values[0], values[1], values[2]
+            if (gender == 'female' and
+                country in countries and
+                min_lat <= float(latitude or 0) <= max_lat):
+                matches.append(dict(zip(self.REGION_FIELDS, values)))
+        batch.clear()
+        return matches
+
     def get_top_players(self, leaderboard: str, limit: int = 10) -> List[str]:
         """
         Retrieve email IDs of top players from a specific leaderboard.
@@ -182,10 +470,13 @@ class RedisClient:
         :return: List of email IDs
         """
         try:
-            top_players = self.redis.zrevrange(leaderboard, 0, limit-1, withscores=False)
-            return [self.redis.hget(player, 'email') for player in top_players]
+            # register_script caches the script's SHA and falls back to
+            # EVAL automatically if the server replies NOSCRIPT.
+            if self._top_players_script is None:
+                self._top_players_script = self.redis.register_script(self.TOP_PLAYERS_LUA)
+            return self._top_players_script(keys=[leaderboard], args=[limit-1])
         except Exception as e:
-            self.logger.error(f"Error retrieving top players: {e}")
+            self.logger.error("Error retrieving top players: %s", e)
             return []
 
     def clear_database(self) -> bool:
@@ -199,11 +490,99 @@ class RedisClient:
             self.logger.info("Database has been cleared.")
             return True
         except Exception as e:
-            self.logger.error(f"Error clearing database: {e}")
+            self.logger.error("Error clearing database: %s", e)
             return False
 
+class AsyncRedisClient:
+    def __init__(self, host: str, port: int, username: str, password: str):
+        """
+        Initialize the asynchronous Redis client with connection parameters.
+
+        :param host: Redis server host
+        :param port: Redis server port
+        :param username: Redis username
+        :param password: Redis password
+        """
+        self.redis = None
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+
+        self.logger = logging.getLogger(__name__)
+
+    async def connect(self) -> bool:
+        """
+        Establish a connection to the Redis database.
+
+        :return: True if connection successful, False otherwise
+        """
+        try:
+            self.redis = redis.asyncio.Redis(
+                host=self.host,
+                port=self.port,
+                username=self.username,
+                password=self.password,
+                decode_responses=True
+            )
+            # Perform a simple ping to verify connection
+            await self.redis.ping()
+            self.logger.info("Successfully connected to Redis.")
+            return True
+        except Exception as e:
+            self.logger.error("Failed to connect to Redis: %s", e)
+            return False
+
+    async def get_user_data(self, user_id: str) -> Optional[Dict[str, str]]:
+        """
+        Retrieve all attributes for a specific user.
+
+        :param user_id: User identifier
+        :return: Dictionary of user attributes or None
+        """
+        try:
+            user_data = await self.redis.hgetall(user_id)
+            return user_data if user_data else None
+        except Exception as e:
+            self.logger.error("Error retrieving user data: %s", e)
+            return None
+
+    async def get_user_coordinates(self, user_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Get the coordinates (longitude and latitude) for a user.
+
+        :param user_id: User identifier
+        :return: Tuple of (longitude, latitude) or None
+        """
+        try:
+            # HMGET fetches both fields in a single round-trip.
+            longitude, latitude = await self.redis.hmget(user_id, 'longitude', 'latitude')
+            return (longitude, latitude) if longitude and latitude else None
+        except Exception as e:
+            self.logger.error("Error retrieving user coordinates: %s", e)
+            return None
+
+    async def get_top_players(self, leaderboard: str, limit: int = 10) -> List[str]:
+        """
+        Retrieve email IDs of top players from a specific leaderboard.
+
+        :param leaderboard: Leaderboard identifier
+        :param limit: Number of top players to retrieve
+        :return: List of email IDs
+        """
+        try:
+            top_players = await self.redis.zrevrange(leaderboard, 0, limit-1, withscores=False)
+            # Pipeline the per-player HGETs into a single round-trip.
+            pipe = self.redis.pipeline(transaction=False)
+            for player in top_players:
+                pipe.hget(player, 'email')
+            return await pipe.execute()
+        except Exception as e:
+            self.logger.error("Error retrieving top players: %s", e)
+            return []
+
 # Example usage
-def main():
+async def main():
     # Connection details should be stored securely, not hardcoded
     redis_client = RedisClient(
         host='redis-16929.c124.us-central1-1.gce.redns.redis-cloud.com',
@@ -211,16 +590,28 @@ def main():
         username='default',
         password='CNPO4piptOIaGMkRW6AjCEILhtozQAUa'
     )
-    
+
     # Connect to Redis
     if redis_client.connect():
         # Load data
         redis_client.load_users('users.txt')
         redis_client.load_scores('userscores.csv')
-        
-        # Example queries
-        print(redis_client.get_user_data('user:1'))
-        print(redis_client.get_top_players('leaderboard:2'))
+
+    # Run the independent example queries concurrently so their network
+    # waits overlap instead of serializing.
+    async_client = AsyncRedisClient(
+        host=redis_client.host,
+        port=redis_client.port,
+        username=redis_client.username,
+        password=redis_client.password
+    )
+    if await async_client.connect():
+        user_data, top_players = await asyncio.gather(
+            async_client.get_user_data('user:1'),
+            async_client.get_top_players('leaderboard:2')
+        )
+        print(user_data)
+        print(top_players)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file